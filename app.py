@@ -1,18 +1,36 @@
-import json
+import atexit
+import hashlib
 import os
 import sqlite3
-from datetime import datetime, date
+import threading
+import time
+from datetime import date
 from dateutil import parser
-from collections import defaultdict, Counter
-from flask import Flask, jsonify, render_template, request, send_from_directory, session, redirect, url_for, flash
+from contextlib import contextmanager
+from flask import Flask, Response, abort, g, jsonify, render_template, request, send_from_directory, session, redirect, url_for, flash
+from flask.json.provider import JSONProvider
 import re
-from functools import wraps
+from functools import lru_cache, wraps
 # remove: import requests
 from geopy.geocoders import Nominatim
-from urllib.parse import urlparse
-import re
+import orjson
+
+class OrjsonProvider(JSONProvider):
+    """jsonify() backed by orjson; responses are built from bytes without a str round-trip."""
+    option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=self.option), mimetype="application/json")
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = os.environ.get("SECRET_KEY", "dev-secret-change-me")  # required for sessions
 ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "changeme")          # set in env for prod
 
@@ -28,45 +46,204 @@ def geocoder():
         _geocoder = Nominatim(user_agent=NOMINATIM_USER_AGENT, timeout=8)
     return _geocoder
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
+SQLITE_PRAGMAS = (
+    "PRAGMA foreign_keys=ON",  # schema relies on ON DELETE CASCADE for link rows
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+# idle long-lived connections; each request borrows one via get_db()
+_idle_conns = []
+_pool_lock = threading.Lock()
+_write_lock = threading.Lock()  # one in-process writer at a time (see write_transaction)
+
+def _connect():
+    # sqlite3 keeps an LRU of prepared statements per connection
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=256)
     conn.row_factory = sqlite3.Row
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    # Python-side parsing the SQL filters/rollups share with incident_to_dict()
+    conn.create_function("incident_date", 2, sql_incident_date, deterministic=True)
+    conn.create_function("py_lower", 1, sql_lower, deterministic=True)
+    if not _schema_state["ready"]:
+        ensure_schema(conn)
     return conn
 
+def get_db():
+    """Request-scoped connection, returned to the pool on teardown. Do not close()."""
+    if "db" not in g:
+        with _pool_lock:
+            conn = _idle_conns.pop() if _idle_conns else None
+        g.db = conn or _connect()
+        g.db_changes = g.db.total_changes
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exc):
+    conn = g.pop("db", None)
+    if conn is None:
+        return
+    if conn.in_transaction:
+        conn.rollback()
+    elif conn.total_changes != g.pop("db_changes"):
+        # refresh planner stats after writes; a no-op most of the time
+        conn.execute("PRAGMA optimize")
+    with _pool_lock:
+        _idle_conns.append(conn)
+
+@atexit.register
+def close_pool():
+    with _pool_lock:
+        while _idle_conns:
+            _idle_conns.pop().close()
+
+def search_text_sql(alias):
+    """The text `q` is matched against: title, content and excerpt joined by spaces."""
+    return (f"COALESCE({alias}.title, '') || ' ' || COALESCE({alias}.content_clean, '')"
+            f" || ' ' || COALESCE({alias}.excerpt_clean, '')")
+
+# Full-text index for the `q` filter. One column over the joined text, so a
+# match may span fields like the old substring test; the trigram tokenizer keeps
+# it case-insensitive. Contentless (only rowids are read back), kept in sync by
+# triggers.
+SEARCH_SCHEMA_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS incidents_fts USING fts5(
+    body, content='', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS incidents_fts_ai AFTER INSERT ON incidents BEGIN
+    INSERT INTO incidents_fts(rowid, body) VALUES (new.id, {search_text_sql("new")});
+END;
+CREATE TRIGGER IF NOT EXISTS incidents_fts_ad AFTER DELETE ON incidents BEGIN
+    INSERT INTO incidents_fts(incidents_fts, rowid, body) VALUES ('delete', old.id, {search_text_sql("old")});
+END;
+CREATE TRIGGER IF NOT EXISTS incidents_fts_au AFTER UPDATE ON incidents BEGIN
+    INSERT INTO incidents_fts(incidents_fts, rowid, body) VALUES ('delete', old.id, {search_text_sql("old")});
+    INSERT INTO incidents_fts(rowid, body) VALUES (new.id, {search_text_sql("new")});
+END;
+"""
+
+# Per-field index from before the joined column; dropped and rebuilt on connect
+DROP_SEARCH_SCHEMA_SQL = """
+DROP TRIGGER IF EXISTS incidents_fts_ai;
+DROP TRIGGER IF EXISTS incidents_fts_ad;
+DROP TRIGGER IF EXISTS incidents_fts_au;
+DROP TABLE IF EXISTS incidents_fts;
+"""
+
+# Reverse lookups for the link tables (their PKs only cover incident_id first),
+# plus the name lookups behind get_or_create_* in case the DB predates them.
+# Forward (incident_id, x) lookups are served by the link tables' PKs.
+INDEX_SCHEMA_SQL = """
+CREATE INDEX IF NOT EXISTS idx_actors_name                ON actors(name);
+CREATE INDEX IF NOT EXISTS idx_tools_name                 ON tools(name);
+CREATE INDEX IF NOT EXISTS idx_incident_actors_actor      ON incident_actors(actor_id, incident_id);
+CREATE INDEX IF NOT EXISTS idx_incident_countries_country ON incident_countries(country_id, incident_id);
+CREATE INDEX IF NOT EXISTS idx_incident_tools_tool        ON incident_tools(tool_id, incident_id);
+CREATE INDEX IF NOT EXISTS idx_incident_sources_source    ON incident_sources(source_id, incident_id);
+"""
+
+_schema_state = {"ready": False, "fts": False}
+_schema_lock = threading.Lock()
+
+def ensure_schema(conn):
+    """One-time migrations on top of the ingest schema (runs on first connect)."""
+    with _schema_lock:
+        if _schema_state["ready"]:
+            return
+        conn.executescript(INDEX_SCHEMA_SQL)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone() is None:
+            conn.execute("ANALYZE")
+        try:
+            fts_cols = [r[1] for r in conn.execute("PRAGMA table_info(incidents_fts)")]
+            if fts_cols and fts_cols != ["body"]:
+                conn.executescript(DROP_SEARCH_SCHEMA_SQL)
+                fts_cols = []
+            conn.executescript(SEARCH_SCHEMA_SQL)
+            if not fts_cols:
+                conn.execute("INSERT INTO incidents_fts(rowid, body) "
+                             f"SELECT id, {search_text_sql('incidents')} FROM incidents")
+            conn.commit()
+            _schema_state["fts"] = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 / trigram: search falls back to a scan
+            conn.rollback()
+        _schema_state["ready"] = True
+
+# in-process caches, invalidated whenever the DB (or its WAL) mtime changes
+_INCIDENTS_CACHE = {"mtime": None, "by_id": None, "meta": None}
+_CENTROIDS_CACHE = {"mtime": None, "data": None, "body": None, "etag": None}
+_VOCAB_CACHE = {"mtime": None, "data": None}
+_cache_lock = threading.Lock()  # dev server is multi-threaded
+
+def db_mtime():
+    # in WAL mode commits only touch the -wal file until a checkpoint
+    try:
+        mtime = os.stat(DB_PATH).st_mtime_ns
+    except OSError:
+        return None
+    try:
+        return mtime, os.stat(DB_PATH + "-wal").st_mtime_ns
+    except OSError:
+        return mtime, None
+
+def invalidate_caches():
+    """Force a reload after our own writes, whatever the filesystem's mtime granularity."""
+    with _cache_lock:
+        _INCIDENTS_CACHE["mtime"] = None
+        _CENTROIDS_CACHE["mtime"] = None
+        _VOCAB_CACHE["mtime"] = None
+
 # ---------- Utilities ----------
+@lru_cache(maxsize=16384)
 def to_date(s):
     if not s:
         return None
+    # ingest stores ISO dates (sometimes with a time part); only free-form text needs dateutil
+    try:
+        return date.fromisoformat(s[:10])
+    except ValueError:
+        pass
     try:
         return parser.parse(s).date()
     except Exception:
         return None
 
-def split_csv(s):
-    """Accept comma-separated string OR list; always return a clean list."""
-    if s is None:
-        return []
-    if isinstance(s, list):
-        return [str(x).strip() for x in s if str(x).strip()]
-    # string path
-    s = str(s)
-    if not s.strip():
-        return []
-    return [part.strip() for part in s.split(",") if part.strip()]
+def incident_date(start_date, date_text):
+    """The date an incident is filtered, bucketed and listed by (start_date, else date_text)."""
+    return to_date(start_date) or to_date(date_text)
+
+def sql_incident_date(start_date, date_text):
+    # incident_date() as an ISO string for SQL; NULL when neither field parses
+    d = incident_date(start_date, date_text)
+    return d.isoformat() if d else None
+
+def sql_lower(s):
+    # SQLite's lower()/LIKE only fold ASCII
+    return s.lower() if s else s
+
+
+# the netloc urlparse() would give: everything between "//" and the path/query/fragment
+_DOMAIN_RE = re.compile(r"(?:[A-Za-z][A-Za-z0-9+.-]*:)?//([^/?#]*)")
 
 def extract_domain(url: str) -> str:
-    try:
-        host = urlparse(url).netloc.lower()
-        if host.startswith("www."): host = host[4:]
-        return host
-    except Exception:
+    m = _DOMAIN_RE.match(url or "")
+    if not m:
         return ""
+    host = m.group(1).lower()
+    if host.startswith("www."): host = host[4:]
+    return host
+
+_URL_SPLIT_RE = re.compile(r"[,\n;]+")
 
 def split_and_clean_urls(val):
     """Accept CSV/semicolon/newline; return unique cleaned URL list."""
     if not val: return []
     if isinstance(val, list): parts = val
-    else: parts = re.split(r"[,\n;]+", str(val))
+    else: parts = _URL_SPLIT_RE.split(str(val))
     out = []
     for p in parts:
         p = p.strip()
@@ -75,20 +252,51 @@ def split_and_clean_urls(val):
             if "://" not in p and "." in p:
                 p = "https://" + p
             out.append(p)
-    return sorted(set(out))
+    return list(dict.fromkeys(out))  # keep the order they were entered in
 
-def get_or_create_source(conn, url: str):
-    """Ensure sources(url, domain) exists; return id."""
-    if not url: return None
-    dom = extract_domain(url)
+def get_or_create_sources(conn, urls):
+    """Ensure sources(url, domain) rows exist for all urls; return {url: id}."""
+    urls = [u for u in dict.fromkeys(urls) if u]
+    if not urls:
+        return {}
     cur = conn.cursor()
-    row = cur.execute("SELECT id FROM sources WHERE url = ?", (url,)).fetchone()
-    if row: return row["id"]
-    cur.execute("INSERT INTO sources (url, domain) VALUES (?, ?)", (url, dom))
-    return cur.lastrowid
-
+    cur.executemany("INSERT INTO sources (url, domain) VALUES (?, ?) ON CONFLICT(url) DO NOTHING",
+                    [(u, extract_domain(u)) for u in urls])
+    return {r["url"]: r["id"] for r in cur.execute(
+        f"SELECT id, url FROM sources WHERE url IN ({_name_marks(urls)})", urls)}
+
+
+def _centroids_entry():
+    mtime = db_mtime()
+    with _cache_lock:
+        if mtime is None or _CENTROIDS_CACHE["mtime"] != mtime:
+            data = _query_centroids()
+            body = orjson.dumps(data)
+            _CENTROIDS_CACHE.update(mtime=mtime, data=data, body=body,
+                                    etag=hashlib.md5(body).hexdigest())
+        return dict(_CENTROIDS_CACHE)
 
 def load_centroids_from_db():
+    """Country name -> {lat, lon}; cached until the DB changes. Treat as read-only."""
+    return _centroids_entry()["data"]
+
+def read_vocab():
+    """Sorted country/actor/tool names for the admin forms; cached until the DB changes."""
+    mtime = db_mtime()
+    with _cache_lock:
+        if mtime is None or _VOCAB_CACHE["mtime"] != mtime:
+            data = {"countries": [], "actors": [], "tools": []}
+            for kind, name in get_db().execute("""
+                SELECT 'countries', name FROM countries
+                UNION ALL SELECT 'actors', name FROM actors
+                UNION ALL SELECT 'tools', name FROM tools
+                ORDER BY 1, 2
+            """):
+                data[kind].append(name)
+            _VOCAB_CACHE.update(mtime=mtime, data=data)
+        return _VOCAB_CACHE["data"]
+
+def _query_centroids():
     conn = get_db()
     conn.row_factory = sqlite3.Row
     cur = conn.execute("SELECT name, lat, lon FROM countries WHERE lat IS NOT NULL AND lon IS NOT NULL")
@@ -101,63 +309,81 @@ def load_centroids_from_db():
         except (TypeError, ValueError):
             continue
         data[row["name"]] = {"lat": lat, "lon": lon}
-    conn.close()
     return data
 
-def filter_incident(inc, filters):
-    """Apply in-Python filters because VIEW returns CSV fields."""
-    # Date range
-    start = filters.get("start")
-    end = filters.get("end")
-    d = to_date(inc.get("start_date")) or to_date(inc.get("date_text"))
-    if start and d and d < start: return False
-    if end and d and d > end: return False
-
-    # Actors / Countries / Tools (incident types)
-    if filters.get("actors"):
-        if not set(split_csv(inc.get("actors"))).intersection(filters["actors"]):
-            return False
-    if filters.get("countries"):
-        if not set(split_csv(inc.get("countries"))).intersection(filters["countries"]):
-            return False
-    if filters.get("tools"):
-        if not set(split_csv(inc.get("tools"))).intersection(filters["tools"]):
-            return False
-    if filters.get("sources"):
-        if not set(split_csv(inc.get("sources"))).intersection(filters["sources"]):
-            return False
+# multi-value filter -> (link table, link fk, lookup table, lookup column)
+LINK_FILTERS = {
+    "actors":    ("incident_actors",    "actor_id",   "actors",    "name"),
+    "countries": ("incident_countries", "country_id", "countries", "name"),
+    "tools":     ("incident_tools",     "tool_id",    "tools",     "name"),
+    "sources":   ("incident_sources",   "source_id",  "sources",   "domain"),
+}
+
+def build_incident_filter(filters):
+    """Translate /api/incidents filters into a WHERE clause over `incidents i`."""
+    where = ["(i.display IS NULL OR i.display <> 'hidden')"]
+    params = []
+
+    # Date range on start_date, else a parseable date_text (undated incidents are never excluded)
+    if filters.get("start"):
+        where.append("COALESCE(incident_date(i.start_date, i.date_text) >= ?, 1)")
+        params.append(filters["start"].isoformat())
+    if filters.get("end"):
+        where.append("COALESCE(incident_date(i.start_date, i.date_text) <= ?, 1)")
+        params.append(filters["end"].isoformat())
+
+    # Actors / Countries / Tools (incident types) / Source domains.
+    # Each becomes a name -> incident_ids lookup over the (x_id, incident_id)
+    # indexes; SQLite intersects the id lists instead of probing every row.
+    for key, (link, fk, table, col) in LINK_FILTERS.items():
+        vals = filters.get(key)
+        if not vals:
+            continue
+        marks = ",".join("?" * len(vals))
+        where.append(f"""i.id IN (SELECT x.incident_id FROM {link} x JOIN {table} t ON t.id = x.{fk}
+                              WHERE t.{col} IN ({marks}))""")
+        params.extend(vals)
 
     # Search text (title + content + excerpt)
     q = filters.get("q")
     if q:
-        hay = " ".join([
-            (inc.get("title") or ""), (inc.get("content_clean") or ""), (inc.get("excerpt_clean") or "")
-        ]).lower()
-        if q.lower() not in hay:
-            return False
-    return True
+        if _schema_state["fts"] and len(q) >= 3:
+            where.append("i.id IN (SELECT rowid FROM incidents_fts WHERE incidents_fts MATCH ?)")
+            params.append('"' + q.replace('"', '""') + '"')
+        else:
+            # trigrams need 3+ chars; short queries scan with a Unicode-aware lower()
+            where.append(f"instr(py_lower({search_text_sql('i')}), ?) > 0")
+            params.append(q.lower())
+
+    return " AND ".join(where), params
 
 def incident_to_dict(row):
     d = dict(row)
-    # normalize for frontend
-    d["countries"] = split_csv(d.get("countries"))
-    d["actors"]    = split_csv(d.get("actors"))
-    d["tools"]     = split_csv(d.get("tools"))
-    d["sources"]     = split_csv(d.get("source_domains")) if "source_domains" in d else []
-    d["source_urls"] = split_csv(d.get("source_urls"))    if "source_urls" in d else []
+    # normalize for frontend; link lists are filled in by _query_all_incidents()
+    d["countries"] = []
+    d["actors"]    = []
+    d["tools"]     = []
+    d["sources"]     = []  # source domains are not exposed on the list view
+    d["source_urls"] = []
+    # parsed once per cache fill; `_` fields are stripped by public_incident()
+    d["_date"] = incident_date(d.get("start_date"), d.get("date_text"))
     return d
 
+
+def public_incident(inc):
+    return {k: v for k, v in inc.items() if not k.startswith("_")}
+
 def collect_meta(incidents):
-    actors = Counter()
-    countries = Counter()
-    tools = Counter()
-    years = Counter()
+    actors = {}
+    countries = {}
+    tools = {}
+    years = {}
     for inc in incidents:
-        for a in inc["actors"]: actors[a] += 1
-        for c in inc["countries"]: countries[c] += 1
-        for t in inc["tools"]: tools[t] += 1
-        dy = to_date(inc.get("start_date")) or to_date(inc.get("date_text"))
-        if dy: years[dy.year] += 1
+        for a in inc["actors"]: actors[a] = actors.get(a, 0) + 1
+        for c in inc["countries"]: countries[c] = countries.get(c, 0) + 1
+        for t in inc["tools"]: tools[t] = tools.get(t, 0) + 1
+        dy = inc["_date"]
+        if dy: years[dy.year] = years.get(dy.year, 0) + 1
     return {
         "actors": sorted(actors.items(), key=lambda x: (-x[1], x[0])),
         "countries": sorted(countries.items(), key=lambda x: (-x[1], x[0])),
@@ -165,12 +391,33 @@ def collect_meta(incidents):
         "years": sorted(years.items())
     }
 
+_SLUG_STRIP_RE = re.compile(r"[^\w\s-]")
+_SLUG_DASH_RE = re.compile(r"[\s_-]+")
+
 def slugify(s: str) -> str:
     s = (s or "").strip().lower()
-    s = re.sub(r"[^\w\s-]", "", s)
-    s = re.sub(r"[\s_-]+", "-", s)
+    s = _SLUG_STRIP_RE.sub("", s)
+    s = _SLUG_DASH_RE.sub("-", s)
     return s.strip("-")
 
+@contextmanager
+def write_transaction(conn):
+    """BEGIN IMMEDIATE ... COMMIT, or ROLLBACK on error.
+
+    Takes the write lock up front so a multi-statement admin save is a single
+    transaction (one WAL commit) and cannot fail halfway on a lock upgrade.
+    In-process writers queue on _write_lock instead of spinning on SQLITE_BUSY;
+    readers never wait (WAL).
+    """
+    with _write_lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
 def login_required(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
@@ -179,65 +426,104 @@ def login_required(fn):
         return fn(*args, **kwargs)
     return wrapper
 
+_CSV_SPLIT_RE = re.compile(r"[;,]")
+
 def split_and_clean_csv(val):
     if not val:
         return []
     if isinstance(val, list):
         vals = val
     else:
-        vals = re.split(r"[;,]", str(val))
-    return sorted({v.strip() for v in vals if v and v.strip()})
+        vals = _CSV_SPLIT_RE.split(str(val))
+    return list(dict.fromkeys(v for v in map(str.strip, vals) if v))
+
+# normalized name -> (lat, lon, looked_up_at); misses expire so transient failures get retried
+_GEOCODE_CACHE = {}
+GEOCODE_MISS_TTL = 15 * 60  # seconds
 
 def geocode_country_external(name: str):
     """Optional Nominatim via geopy. Returns (lat, lon) or (None, None)."""
     if not ALLOW_EXTERNAL_GEOCODING or not name:
         return None, None
+    key = name.strip().lower()
+    hit = _GEOCODE_CACHE.get(key)
+    if hit and (hit[0] is not None or time.monotonic() - hit[2] < GEOCODE_MISS_TTL):
+        return hit[0], hit[1]
+    lat, lon = None, None
     try:
         loc = geocoder().geocode(name, exactly_one=True)
         if loc:
-            return float(loc.latitude), float(loc.longitude)
+            lat, lon = float(loc.latitude), float(loc.longitude)
     except Exception:
         pass
-    return None, None
+    _GEOCODE_CACHE[key] = (lat, lon, time.monotonic())
+    return lat, lon
 
-def get_or_create_country(conn, name: str):
+def _name_marks(names):
+    return ",".join("?" * len(names))
+
+def get_or_create_countries(conn, names):
+    """Ensure countries exist for all names; returns {name: id}, geocoding only rows that need it."""
+    names = [n for n in dict.fromkeys(names) if n]
+    if not names:
+        return {}
     cur = conn.cursor()
-    row = cur.execute("SELECT id, lat, lon FROM countries WHERE name = ?", (name,)).fetchone()
-    if row:
-        cid = row["id"]
-        if (row["lat"] is None or row["lon"] is None):
-            lat, lon = geocode_country_external(name)
+    select_sql = f"SELECT id, name, lat, lon FROM countries WHERE name IN ({_name_marks(names)})"
+    rows = {r["name"]: r for r in cur.execute(select_sql, names).fetchall()}
+    fills = []
+    for r in rows.values():
+        if r["lat"] is None or r["lon"] is None:
+            lat, lon = geocode_country_external(r["name"])
             if lat is not None and lon is not None:
-                cur.execute("UPDATE countries SET lat = ?, lon = ? WHERE id = ?", (lat, lon, cid))
-        return cid
-    lat, lon = geocode_country_external(name)
-    cur.execute("INSERT INTO countries (name, lat, lon) VALUES (?, ?, ?)", (name, lat, lon))
-    return cur.lastrowid
-
-def get_or_create_actor(conn, name: str):
+                fills.append((lat, lon, r["id"]))
+    cur.executemany("UPDATE countries SET lat = ?, lon = ? WHERE id = ?", fills)
+    missing = [n for n in names if n not in rows]
+    if missing:
+        cur.executemany(
+            "INSERT INTO countries (name, lat, lon) VALUES (?, ?, ?) ON CONFLICT(name) DO NOTHING",
+            [(n, *geocode_country_external(n)) for n in missing],
+        )
+        rows = {r["name"]: r for r in cur.execute(select_sql, names).fetchall()}
+    return {name: r["id"] for name, r in rows.items()}
+
+def get_or_create_terms(conn, table: str, names, taxonomy: str):
+    """Ensure actors/tools terms exist for all names; returns {name: id}, inserting missing ones at once."""
+    names = [n for n in dict.fromkeys(names) if n]
+    if not names:
+        return {}
     cur = conn.cursor()
-    row = cur.execute("SELECT id FROM actors WHERE name = ?", (name,)).fetchone()
-    if row:
-        return row["id"]
-    # generate a unique term_id
-    next_term = cur.execute("SELECT COALESCE(MAX(term_id), 0) + 1 FROM actors").fetchone()[0]
-    cur.execute(
-        "INSERT INTO actors (term_id, name, slug, taxonomy, description) VALUES (?, ?, ?, ?, ?)",
-        (next_term, name, slugify(name), "threat_actor", None),
-    )
-    return cur.lastrowid
-
-def get_or_create_tool(conn, name: str):
+    select_sql = f"SELECT id, name FROM {table} WHERE name IN ({_name_marks(names)}) ORDER BY id DESC"
+    ids = {r["name"]: r["id"] for r in cur.execute(select_sql, names).fetchall()}
+    missing = [n for n in names if n not in ids]
+    if missing:
+        # generate unique term_ids (one MAX scan per batch)
+        next_term = cur.execute(f"SELECT COALESCE(MAX(term_id), 0) + 1 FROM {table}").fetchone()[0]
+        cur.executemany(
+            f"INSERT INTO {table} (term_id, name, slug, taxonomy, description) VALUES (?, ?, ?, ?, ?)",
+            [(next_term + k, n, slugify(n), taxonomy, None) for k, n in enumerate(missing)],
+        )
+        ids = {r["name"]: r["id"] for r in cur.execute(select_sql, names).fetchall()}
+    return ids
+
+def link_incident(conn, incident_id: int, countries, actors, tools, source_urls):
+    """Create any missing countries/actors/tools/sources and link them to the incident.
+
+    One batched lookup/insert per vocabulary and one executemany per link table.
+    """
     cur = conn.cursor()
-    row = cur.execute("SELECT id FROM tools WHERE name = ?", (name,)).fetchone()
-    if row:
-        return row["id"]
-    next_term = cur.execute("SELECT COALESCE(MAX(term_id), 0) + 1 FROM tools").fetchone()[0]
-    cur.execute(
-        "INSERT INTO tools (term_id, name, slug, taxonomy, description) VALUES (?, ?, ?, ?, ?)",
-        (next_term, name, slugify(name), "incident_type", None),
-    )
-    return cur.lastrowid
+    # countries: create if missing; auto-geocode if allowed
+    country_ids = get_or_create_countries(conn, countries)
+    cur.executemany("INSERT OR IGNORE INTO incident_countries (incident_id, country_id) VALUES (?, ?)",
+                    [(incident_id, cid) for cid in country_ids.values()])
+    actor_ids = get_or_create_terms(conn, "actors", actors, "threat_actor")
+    cur.executemany("INSERT OR IGNORE INTO incident_actors (incident_id, actor_id) VALUES (?, ?)",
+                    [(incident_id, aid) for aid in actor_ids.values()])
+    tool_ids = get_or_create_terms(conn, "tools", tools, "incident_type")
+    cur.executemany("INSERT OR IGNORE INTO incident_tools (incident_id, tool_id) VALUES (?, ?)",
+                    [(incident_id, tid) for tid in tool_ids.values()])
+    source_ids = get_or_create_sources(conn, source_urls)
+    cur.executemany("INSERT OR IGNORE INTO incident_sources (incident_id, source_id) VALUES (?, ?)",
+                    [(incident_id, sid) for sid in source_ids.values()])
 
 
 # ---------- Routes ----------
@@ -246,60 +532,151 @@ def index():
     is_admin = session.get("admin", False)
     return render_template("index.html", is_admin=is_admin)
 
-@app.route("/api/config")
-def api_config():
-    # Color tokens + actor palette (extend as needed)
-    config = {
-        "colors": {
-            "primary": "#cf2e2e",
-            "accent_orange": "#ff6900",
-            "accent_yellow": "#fcb900",
-            "accent_green": "#7bdcb5",
-            "accent_teal": "#00d084",
-            "accent_lightblue": "#8ed1fc",
-            "accent_blue": "#0693e3",
-            "accent_purple": "#9b51e0",
-            "accent_pink": "#f78da7",
-            "ta_russia": "#0d47a1",
-            "ta_china": "#8b0000"
-        },
-        # default actor colors; add more at will
-        "actor_palette": {
-            "Russia": "#0d47a1",
-            "China": "#8b0000",
-            "Iran": "#9b51e0",
-            "Other": "#444444",
-            "Unknown": "#7f7f7f"
-        }
+# Color tokens + actor palette (extend as needed); static, so encoded once
+API_CONFIG = {
+    "colors": {
+        "primary": "#cf2e2e",
+        "accent_orange": "#ff6900",
+        "accent_yellow": "#fcb900",
+        "accent_green": "#7bdcb5",
+        "accent_teal": "#00d084",
+        "accent_lightblue": "#8ed1fc",
+        "accent_blue": "#0693e3",
+        "accent_purple": "#9b51e0",
+        "accent_pink": "#f78da7",
+        "ta_russia": "#0d47a1",
+        "ta_china": "#8b0000"
+    },
+    # default actor colors; add more at will
+    "actor_palette": {
+        "Russia": "#0d47a1",
+        "China": "#8b0000",
+        "Iran": "#9b51e0",
+        "Other": "#444444",
+        "Unknown": "#7f7f7f"
     }
-    return jsonify(config)
+}
+
+_CONFIG_BYTES = orjson.dumps(API_CONFIG)
+_CONFIG_ETAG = hashlib.md5(_CONFIG_BYTES).hexdigest()
 
-def read_all_incidents():
+@app.route("/api/config")
+def api_config():
+    resp = Response(_CONFIG_BYTES, mimetype="application/json")
+    resp.set_etag(_CONFIG_ETAG)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = 3600
+    return resp.make_conditional(request)
+
+def _incident_store():
+    mtime = db_mtime()
+    with _cache_lock:
+        if mtime is None or _INCIDENTS_CACHE["mtime"] != mtime:
+            rows = _query_all_incidents()
+            _INCIDENTS_CACHE.update(mtime=mtime,
+                                    by_id={r["incident_id"]: r for r in rows},
+                                    meta=collect_meta(rows))
+        return dict(_INCIDENTS_CACHE)
+
+def read_incidents_by_id():
+    """incident_id -> visible incident dict; cached until the DB changes. Treat as read-only."""
+    return _incident_store()["by_id"]
+
+def read_meta():
+    """collect_meta() over all incidents, computed once per cache fill."""
+    return _incident_store()["meta"]
+
+def _query_all_incidents():
+    # base tables instead of incidents_denorm: no per-row GROUP_CONCAT subqueries
+    # and no CSV round-trip, just one pass over the link rows
     conn = get_db()
     cur = conn.cursor()
     cur.execute("""
-        SELECT incident_id, post_id, slug, title, link, content_clean, excerpt_clean,
-               date_text, start_date, end_date, display, published_at,
-               countries, actors, tools, source_urls
-        FROM incidents_denorm
+        SELECT id AS incident_id, post_id, slug, title, link, content_clean, excerpt_clean,
+               date_text, start_date, end_date, display, published_at
+        FROM incidents
         WHERE display IS NULL OR display <> 'hidden'
+        ORDER BY id
     """)
     rows = [incident_to_dict(r) for r in cur.fetchall()]
-    conn.close()
+    by_id = {d["incident_id"]: d for d in rows}
+    cur.execute("""
+        SELECT ic.incident_id, 'countries', c.name
+          FROM incident_countries ic JOIN countries c ON c.id = ic.country_id
+        UNION ALL
+        SELECT ia.incident_id, 'actors', a.name
+          FROM incident_actors ia JOIN actors a ON a.id = ia.actor_id
+        UNION ALL
+        SELECT it.incident_id, 'tools', t.name
+          FROM incident_tools it JOIN tools t ON t.id = it.tool_id
+        UNION ALL
+        SELECT xis.incident_id, 'source_urls', s.url
+          FROM incident_sources xis JOIN sources s ON s.id = xis.source_id
+    """)
+    for incident_id, field, value in cur:
+        d = by_id.get(incident_id)
+        value = (value or "").strip()
+        if d is not None and value and value not in d[field]:
+            d[field].append(value)
     return rows
 
+def aggregate_filtered(conn):
+    """Widget rollups over temp.filtered_ids, counted by SQLite rather than in Python."""
+    # explode the actor dimension once; every rollup below is "by actor"
+    conn.execute("DROP TABLE IF EXISTS temp.filtered_actors")
+    conn.execute("""
+        CREATE TEMP TABLE filtered_actors AS
+        SELECT DISTINCT f.id AS incident_id, COALESCE(a.name, 'Unknown') AS actor
+          FROM filtered_ids f
+          LEFT JOIN incident_actors ia ON ia.incident_id = f.id
+          LEFT JOIN actors a ON a.id = ia.actor_id
+    """)
+
+    # heatmap: counts by (year, actor); year of incident_date(), as in /api/meta
+    heatmap_rows = [dict(r) for r in conn.execute("""
+        SELECT CAST(substr(incident_date(i.start_date, i.date_text), 1, 4) AS INTEGER) AS year,
+               fa.actor AS actor,
+               COUNT(*) AS count
+          FROM filtered_actors fa
+          JOIN incidents i ON i.id = fa.incident_id
+         GROUP BY year, actor
+        HAVING year IS NOT NULL
+    """)]
+
+    # stacked bar: tools x actor
+    stacked_rows = [dict(r) for r in conn.execute("""
+        SELECT COALESCE(t.name, 'Unspecified') AS tool,
+               fa.actor AS actor,
+               COUNT(DISTINCT fa.incident_id) AS count
+          FROM filtered_actors fa
+          LEFT JOIN incident_tools it ON it.incident_id = fa.incident_id
+          LEFT JOIN tools t ON t.id = it.tool_id
+         GROUP BY tool, actor
+    """)]
+
+    # country x actor counts (for map donuts)
+    country_rows = [dict(r) for r in conn.execute("""
+        SELECT COALESCE(c.name, 'Unassigned') AS country,
+               fa.actor AS actor,
+               COUNT(DISTINCT fa.incident_id) AS count
+          FROM filtered_actors fa
+          LEFT JOIN incident_countries ic ON ic.incident_id = fa.incident_id
+          LEFT JOIN countries c ON c.id = ic.country_id
+         GROUP BY country, actor
+    """)]
+    return heatmap_rows, stacked_rows, country_rows
+
 @app.route("/api/meta")
 def api_meta():
-    incidents = read_all_incidents()
-    meta = collect_meta(incidents)
-    return jsonify(meta)
+    return jsonify(read_meta())
 
 @app.route("/api/incidents")
 def api_incidents():
     # Parse filters
     def parse_multi(name):
+        # de-duplicated once here so each value is bound to the IN (...) list only once
         v = request.args.get(name, "").strip()
-        return [s for s in v.split(",") if s] if v else []
+        return list(dict.fromkeys(s for s in v.split(",") if s)) if v else []
 
     start = request.args.get("start")
     end = request.args.get("end")
@@ -316,72 +693,41 @@ def api_incidents():
     page = max(1, int(request.args.get("page", 1)))
     page_size = min(100, int(request.args.get("page_size", 25)))
 
-    incidents = read_all_incidents()
-    filtered = [inc for inc in incidents if filter_incident(inc, filters)]
-
-    # Aggregations for widgets
-    # heatmap: counts by (year, actor)
-    heatmap = defaultdict(lambda: defaultdict(int))
-    for inc in filtered:
-        y = to_date(inc.get("start_date")) or to_date(inc.get("date_text"))
-        if not y: continue
-        year = y.year
-        for a in (inc["actors"] or ["Unknown"]):
-            heatmap[year][a] += 1
-    heatmap_rows = []
-    for year, bucket in heatmap.items():
-        for actor, count in bucket.items():
-            heatmap_rows.append({"year": year, "actor": actor, "count": count})
+    where, params = build_incident_filter(filters)
+    conn = get_db()
+    conn.execute("DROP TABLE IF EXISTS temp.filtered_ids")
+    conn.execute(f"CREATE TEMP TABLE filtered_ids AS SELECT i.id FROM incidents i WHERE {where}", params)
 
-    # stacked bar: tools x actor
-    tba = defaultdict(lambda: defaultdict(int))
-    for inc in filtered:
-        tools = inc["tools"] or ["Unspecified"]
-        actors = inc["actors"] or ["Unknown"]
-        for t in tools:
-            for a in actors:
-                tba[t][a] += 1
-    stacked_rows = []
-    for tool, bucket in tba.items():
-        for actor, count in bucket.items():
-            stacked_rows.append({"tool": tool, "actor": actor, "count": count})
+    # Aggregations for widgets (over the whole filtered set)
+    heatmap_rows, stacked_rows, country_rows = aggregate_filtered(conn)
 
-    # country x actor counts (for map donuts)
-    cxa = defaultdict(lambda: defaultdict(int))
-    for inc in filtered:
-        cs = inc["countries"] or ["Unassigned"]
-        as_ = inc["actors"] or ["Unknown"]
-        for c in cs:
-            for a in as_:
-                cxa[c][a] += 1
-    country_rows = []
-    total_by_country = {}
-    for country, bucket in cxa.items():
-        tot = sum(bucket.values())
-        total_by_country[country] = tot
-        for actor, count in bucket.items():
-            country_rows.append({"country": country, "actor": actor, "count": count})
-
-    # paging
-    total = len(filtered)
+    # paging: only the requested page leaves SQLite
+    total = conn.execute("SELECT COUNT(*) FROM filtered_ids").fetchone()[0]
     start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    page_items = filtered[start_idx:end_idx]
-
-    # attach country metadata (lat/lon/region/ subregion)
-    centroids = load_centroids_from_db()
+    page_ids = [r[0] for r in conn.execute(
+        "SELECT id FROM filtered_ids ORDER BY id LIMIT ? OFFSET ?", (max(page_size, 0), start_idx))]
+    by_id = read_incidents_by_id()
+    page_items = [by_id[i] for i in page_ids if i in by_id]
 
     return jsonify({
         "total": total,
         "page": page,
         "page_size": page_size,
-        "incidents": page_items,
+        "incidents": [public_incident(inc) for inc in page_items],
         "heatmap": heatmap_rows,
         "stacked": stacked_rows,
-        "country_actor": country_rows,
-        "country_meta": centroids
+        "country_actor": country_rows
     })
 
+@app.route("/api/centroids")
+def api_centroids():
+    """Country centroids for the map; clients revalidate with the ETag."""
+    entry = _centroids_entry()
+    resp = Response(entry["body"], mimetype="application/json")
+    resp.set_etag(entry["etag"])
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
 # Static helper to serve the centroids stub if needed
 @app.route("/static/data/<path:filename>")
 def static_data(filename):
@@ -412,11 +758,6 @@ def admin_new_incident():
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
-    # preload lists for the form
-    countries = cur.execute("SELECT name FROM countries ORDER BY name").fetchall()
-    actors = cur.execute("SELECT name FROM actors ORDER BY name").fetchall()
-    tools = cur.execute("SELECT name FROM tools ORDER BY name").fetchall()
-
     if request.method == "POST":
         try:
             post_id = int(request.form["post_id"])
@@ -446,58 +787,47 @@ def admin_new_incident():
             sel_actors = sorted(set(sel_actors) | set(new_actors))
             sel_tools  = sorted(set(sel_tools)  | set(new_tools))
 
-            # insert incident
-            cur.execute("""
-                INSERT INTO incidents (post_id, title, link, content_clean, excerpt_clean, date_text, start_date, end_date, display)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (post_id, title, link, content, excerpt, date_text, start_date, end_date, display))
-            incident_id = cur.lastrowid
-
-            # relate countries (create if missing; auto-geocode if allowed)
-            for c in sel_countries:
-                if not c: continue
-                cid = get_or_create_country(conn, c)
-                cur.execute("INSERT OR IGNORE INTO incident_countries (incident_id, country_id) VALUES (?, ?)", (incident_id, cid))
-
-            # relate actors (create if missing)
-            for a in sel_actors:
-                if not a: continue
-                aid = get_or_create_actor(conn, a)
-                cur.execute("INSERT OR IGNORE INTO incident_actors (incident_id, actor_id) VALUES (?, ?)", (incident_id, aid))
-
-            # relate tools (create if missing)
-            for t in sel_tools:
-                if not t: continue
-                tid = get_or_create_tool(conn, t)
-                cur.execute("INSERT OR IGNORE INTO incident_tools (incident_id, tool_id) VALUES (?, ?)", (incident_id, tid))
-
-             # after inserting the base incident and linking countries/actors/tools:
-            for u in sel_sources:
-                sid = get_or_create_source(conn, u)
-                if sid:
-                    cur.execute("INSERT OR IGNORE INTO incident_sources (incident_id, source_id) VALUES (?, ?)", (incident_id, sid))
-                        # countries still from CSV box (kept as-is)
-                        
-            conn.commit()
+            # one write transaction for the incident and all its links
+            with write_transaction(conn):
+                # insert incident
+                cur.execute("""
+                    INSERT INTO incidents (post_id, title, link, content_clean, excerpt_clean, date_text, start_date, end_date, display)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (post_id, title, link, content, excerpt, date_text, start_date, end_date, display))
+                incident_id = cur.lastrowid
+
+                # relate countries/actors/tools/sources (create if missing)
+                link_incident(conn, incident_id, sel_countries, sel_actors, sel_tools, sel_sources)
+
+            invalidate_caches()
             flash(f"Incident #{incident_id} created.", "ok")
             return redirect(url_for("admin_new_incident"))
 
         except sqlite3.IntegrityError as e:
-            conn.rollback()
-            # likely duplicate post_id or FK issue
+            # likely duplicate post_id or FK issue (already rolled back)
             flash(f"DB error: {e}", "err")
         except Exception as e:
-            conn.rollback()
             flash(f"Unexpected error: {e}", "err")
 
+    vocab = read_vocab()
     return render_template(
         "admin_new_incident.html",
-        countries=[r["name"] for r in countries],
-        actors=[r["name"] for r in actors],
-        tools=[r["name"] for r in tools],
+        countries=vocab["countries"],
+        actors=vocab["actors"],
+        tools=vocab["tools"],
         allow_external_geocoding=ALLOW_EXTERNAL_GEOCODING
     )
     
+@app.route("/admin/reload-centroids")
+@login_required
+def admin_reload_centroids():
+    """Debug helper: drop the cached centroids and reload them from the DB."""
+    if not app.debug:
+        abort(404)
+    with _cache_lock:
+        _CENTROIDS_CACHE["mtime"] = None
+    return jsonify({"countries": len(load_centroids_from_db())})
+
 @app.route("/admin/incidents")
 @login_required
 def admin_incidents():
@@ -508,7 +838,6 @@ def admin_incidents():
         ORDER BY COALESCE(start_date, date_text) DESC, id DESC
         LIMIT 1000
     """).fetchall()
-    conn.close()
     return render_template("admin_list.html", items=rows)
 
 @app.route("/admin/incident/<int:incident_id>/edit", methods=["GET","POST"])
@@ -517,11 +846,6 @@ def admin_edit_incident(incident_id):
     conn = get_db(); conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
-    # preload vocab
-    countries_all = [r["name"] for r in cur.execute("SELECT name FROM countries ORDER BY name").fetchall()]
-    actors_all    = [r["name"] for r in cur.execute("SELECT name FROM actors ORDER BY name").fetchall()]
-    tools_all     = [r["name"] for r in cur.execute("SELECT name FROM tools ORDER BY name").fetchall()]
-
     # fetch incident + relations
     inc = cur.execute("SELECT * FROM incidents WHERE id = ?", (incident_id,)).fetchone()
     if not inc:
@@ -568,49 +892,39 @@ def admin_edit_incident(incident_id):
             sel_countries = split_and_clean_csv(request.form.get("countries_csv"))
             sel_sources   = split_and_clean_urls(request.form.get("sources_urls"))
 
-            # update base record
-            cur.execute("""
-                UPDATE incidents
-                   SET post_id=?, title=?, link=?, content_clean=?, excerpt_clean=?, date_text=?, start_date=?, end_date=?, display=?
-                 WHERE id=?
-            """, (post_id, title, link, content, excerpt, date_text, start_date, end_date, display, incident_id))
-
-            # reset junctions
-            cur.execute("DELETE FROM incident_countries WHERE incident_id=?", (incident_id,))
-            cur.execute("DELETE FROM incident_actors    WHERE incident_id=?", (incident_id,))
-            cur.execute("DELETE FROM incident_tools     WHERE incident_id=?", (incident_id,))
-            cur.execute("DELETE FROM incident_sources   WHERE incident_id=?", (incident_id,))
-
-            # reinsert
-            for c in sel_countries:
-                cid = get_or_create_country(conn, c)
-                cur.execute("INSERT OR IGNORE INTO incident_countries (incident_id, country_id) VALUES (?, ?)", (incident_id, cid))
-            for a in sel_actors:
-                aid = get_or_create_actor(conn, a)
-                cur.execute("INSERT OR IGNORE INTO incident_actors (incident_id, actor_id) VALUES (?, ?)", (incident_id, aid))
-            for t in sel_tools:
-                tid = get_or_create_tool(conn, t)
-                cur.execute("INSERT OR IGNORE INTO incident_tools (incident_id, tool_id) VALUES (?, ?)", (incident_id, tid))
-            for u in sel_sources:
-                sid = get_or_create_source(conn, u)
-                if sid:
-                    cur.execute("INSERT OR IGNORE INTO incident_sources (incident_id, source_id) VALUES (?, ?)", (incident_id, sid))
+            with write_transaction(conn):
+                # update base record
+                cur.execute("""
+                    UPDATE incidents
+                       SET post_id=?, title=?, link=?, content_clean=?, excerpt_clean=?, date_text=?, start_date=?, end_date=?, display=?
+                     WHERE id=?
+                """, (post_id, title, link, content, excerpt, date_text, start_date, end_date, display, incident_id))
 
-            conn.commit()
+                # reset junctions
+                cur.execute("DELETE FROM incident_countries WHERE incident_id=?", (incident_id,))
+                cur.execute("DELETE FROM incident_actors    WHERE incident_id=?", (incident_id,))
+                cur.execute("DELETE FROM incident_tools     WHERE incident_id=?", (incident_id,))
+                cur.execute("DELETE FROM incident_sources   WHERE incident_id=?", (incident_id,))
+
+                # reinsert
+                link_incident(conn, incident_id, sel_countries, sel_actors, sel_tools, sel_sources)
+
+            invalidate_caches()
             flash(f"Incident #{incident_id} updated.", "ok")
             return redirect(url_for("admin_edit_incident", incident_id=incident_id))
         except Exception as e:
-            conn.rollback()
+            # already rolled back by write_transaction
             flash(f"Update failed: {e}", "err")
 
     # render form prefilled
+    vocab = read_vocab()
     return render_template(
         "admin_new_incident.html",
         # same template, but with 'incident' populated
         incident=inc,
-        countries=countries_all,
-        actors=actors_all,
-        tools=tools_all,
+        countries=vocab["countries"],
+        actors=vocab["actors"],
+        tools=vocab["tools"],
         sel_countries="; ".join(countries),
         sel_sources="\n".join(source_urls),
         sel_actors=actors,
@@ -623,14 +937,12 @@ def admin_edit_incident(incident_id):
 def admin_delete_incident(incident_id):
     conn = get_db()
     try:
-        conn.execute("DELETE FROM incidents WHERE id = ?", (incident_id,))
-        conn.commit()
+        with write_transaction(conn):
+            conn.execute("DELETE FROM incidents WHERE id = ?", (incident_id,))
+        invalidate_caches()
         flash(f"Incident #{incident_id} deleted.", "ok")
     except Exception as e:
-        conn.rollback()
         flash(f"Delete failed: {e}", "err")
-    finally:
-        conn.close()
     return redirect(url_for("admin_incidents"))
 
 
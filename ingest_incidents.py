@@ -4,7 +4,7 @@
 ingest_incidents_merge.py
 
 Usage:
-  python ingest_incidents_merge.py --db incidents.sqlite [--geojson geo_incidents.json] [--wpjson incidents_10000.json]
+  python ingest_incidents_merge.py --db incidents.sqlite [--geojson geo_incidents.json] [--wpjson incidents_10000.json] [--workers N]
 
 - Creates/updates the SQLite schema
 - Ingests:
@@ -16,44 +16,57 @@ Usage:
 """
 
 import argparse
+import hashlib
 import json
+import multiprocessing
 import re
 import sqlite3
 import sys
-from datetime import datetime
+from calendar import monthrange
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain
 from html import unescape
 from html.parser import HTMLParser
-from typing import Optional, Iterable
-from urllib.parse import urlparse
+from typing import Optional
+
+try:
+    import orjson  # pinned in requirements.txt for the app; stdlib json otherwise
+except ImportError:
+    orjson = None
+
+try:
+    import ijson  # optional: stream large inputs instead of loading them whole
+except ImportError:
+    ijson = None
+
+try:
+    import re2  # optional (google-re2): linear-time matching, no backtracking
+except ImportError:
+    re2 = None
 
 # ---------- Cleaning helpers ----------
-# Removes WP-style shortcodes like [shortcode]...[/shortcode], but not whats between the tags
-SHORTCODE_RE = re.compile(
-    r"""
-    # Match opening shortcode tag and capture content, then closing tag
-    \[                          # opening bracket
-    ([a-zA-Z0-9_]+)             # capture shortcode name (group 1)
-    (?:                         # optional attributes group
-        \s+                     # whitespace before attributes
-        [^\]]*                  # any characters except closing bracket (more flexible than [^\]]+)
-    )?                          # end optional attributes
-    \]                          # closing bracket
-    (.*?)                       # capture content between tags (group 2) - non-greedy
-    \[/\1\]                     # closing tag with same name as opening (backreference to group 1)
-    |                           # OR
-    # Match self-closing shortcodes (no content to preserve)
-    \[                          # opening bracket
-    [a-zA-Z0-9_]+               # shortcode name
-    (?:                         # optional attributes group
-        \s+                     # whitespace before attributes
-        [^\]]*                  # any characters except closing bracket
-    )?                          # end optional attributes
-    /?                          # optional forward slash for self-closing
-    \]                          # closing bracket
-    """,
-    re.DOTALL | re.VERBOSE,
-)
-TAG_RE = re.compile(r"<[^>]+>")
+
+def compile_linear(pattern: str):
+    """Compile with RE2 when installed, else stdlib re.
+
+    RE2 has no backreferences and takes flags inline only (e.g. "(?s)"),
+    so only patterns written within that subset should go through here.
+    """
+    return (re2 or re).compile(pattern)
+
+# WP-style shortcodes like [shortcode]...[/shortcode] are removed, keeping what's between the tags.
+# One token per tag: closing slash (1), name (2), attributes (3), self-closing slash (4).
+SHORTCODE_RE = compile_linear(r"\[(/?)([a-zA-Z0-9_]+)(\s+[^\]]*)?(/?)\]")
+TAG_RE = compile_linear(r"<[^>]+>")
+# Flat markup (plain start/end tags) is stripped with one regex pass; comments,
+# declarations and script/style bodies still go through HTMLParser.
+HTML_TAG_RE = compile_linear(r"</?[A-Za-z][^>]*>")
+HTML_COMPLEX_RE = compile_linear(r"(?i)<(?:!|\?|script|style)")
+# Collapses [ \t\r\f\v]+ to one space, but skips runs that already are a single
+# space (most matches in prose), so the sub only rebuilds strings that change.
+WS_RE = re.compile(r"[\t\r\f\v][ \t\r\f\v]*| [ \t\r\f\v]+")
+NL_RE = re.compile(r"\n{2,}")
 
 class TextExtractor(HTMLParser):
     def __init__(self):
@@ -64,55 +77,72 @@ class TextExtractor(HTMLParser):
     def handle_entityref(self, name): self.parts.append(unescape(f"&{name};"))
     def handle_charref(self, name):   self.parts.append(unescape(f"&#{name};"))
     def get_text(self): return "".join(self.parts)
+    def reset_state(self):
+        self.reset()  # HTMLParser's own buffers
+        self.parts.clear()
+
+_extractor = TextExtractor()  # reused by strip_html; the ingest is single-threaded
 
 # Removes WP-style shortcodes like [shortcode]...[/shortcode] but preserves content between the tags
 def strip_shortcodes(text: str) -> str:
     if not text:
         return ""
-    
-    # Handle nested shortcodes by repeatedly processing until no more changes
-    prev_text = None
-    current_text = text
-    
-    def replace_shortcode(match):
-        # If group 2 exists, it means we matched a paired shortcode with content
-        if match.group(2) is not None:
-            return match.group(2)  # Return just the content between the tags
+    if "[" not in text:
+        return text
+
+    # One left-to-right pass. Opening and self-closing tags always go; a closing
+    # tag goes only if an earlier opening tag of the same name is still unclosed
+    # (a per-name count handles nesting), otherwise it is left in the text.
+    out = []
+    pos = 0
+    open_tags = {}
+    for m in SHORTCODE_RE.finditer(text):
+        closing, name, attrs, self_closing = m.groups()
+        out.append(text[pos:m.start()])
+        pos = m.end()
+        if not closing:
+            if not self_closing:
+                open_tags[name] = open_tags.get(name, 0) + 1
+        elif not attrs and not self_closing and open_tags.get(name):
+            open_tags[name] -= 1
         else:
-            return ""  # Self-closing shortcode, remove entirely
-    
-    # Keep processing until no more shortcodes are found (handles nested structures)
-    max_iterations = 50  # Safety limit to prevent infinite loops
-    iteration = 0
-    
-    while prev_text != current_text and iteration < max_iterations:
-        prev_text = current_text
-        current_text = SHORTCODE_RE.sub(replace_shortcode, current_text)
-        iteration += 1
-    
-    return current_text
+            out.append(m.group())  # unmatched / malformed closing tag
+    out.append(text[pos:])
+    return "".join(out)
 
 def strip_html(text: str) -> str:
     if not text: 
         return ""
-    parser = TextExtractor()
+    if not HTML_COMPLEX_RE.search(text):
+        return unescape(HTML_TAG_RE.sub("", text)).strip()
+    _extractor.reset_state()
     try:
-        parser.feed(text)
-        return parser.get_text().strip()
+        _extractor.feed(text)
+        return _extractor.get_text().strip()
     except Exception:
         return TAG_RE.sub("", text).strip()
 
+@lru_cache(maxsize=2048)  # pure; re-ingests and geo+WP overlap repeat the same text
 def clean_rich_text(raw: Optional[str]) -> str:
     if not raw: return ""
     s = unescape(raw)
-    s = strip_shortcodes(s)
-    s = strip_html(s)
-    s = re.sub(r"[ \t\r\f\v]+", " ", s)
-    s = re.sub(r"\n{2,}", "\n", s).strip()
-    return s
+    # plain text (no '[' / '<', common for short fields) skips both markup passes
+    if "[" in s:
+        s = strip_shortcodes(s)
+    if "<" in s:
+        s = strip_html(s)
+    elif "&" in s:
+        s = unescape(s)  # what strip_html's tag-free path would still have done
+    s = WS_RE.sub(" ", s)
+    if "\n\n" in s:
+        s = NL_RE.sub("\n", s)
+    return s.strip()
 
 # ---------- Date normalization ----------
 
+MDY_RE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})")
+
+@lru_cache(maxsize=4096)  # few distinct date strings, each seen many times
 def normalize_date(s: Optional[str]) -> Optional[str]:
     """
     Accepts 'YYYYMMDD', 'YYYYMM', 'YYYY', 'MM/DD/YYYY', 'M/D/YYYY', '' -> 'YYYY-MM-DD' or None.
@@ -121,26 +151,38 @@ def normalize_date(s: Optional[str]) -> Optional[str]:
     s = s.strip()
     if not s: return None
 
-    # common numeric formats
-    if s.isdigit():
-        try:
-            if len(s) == 8:
-                return datetime.strptime(s, "%Y%m%d").strftime("%Y-%m-%d")
-            if len(s) == 6:
-                return datetime.strptime(s, "%Y%m").strftime("%Y-%m-01")
-            if len(s) == 4:
-                return datetime.strptime(s, "%Y").strftime("%Y-%m-%01")
-        except ValueError:
+    # common numeric formats: slice and range-check instead of strptime
+    if s.isdigit() and s.isascii():
+        n = len(s)
+        if n not in (4, 6, 8):
             return None
+        y = int(s[:4])
+        m = int(s[4:6]) if n >= 6 else 1
+        d = int(s[6:8]) if n == 8 else 1
+        if y < 1 or not 1 <= m <= 12 or not 1 <= d <= monthrange(y, m)[1]:
+            return None
+        return f"{s[:4]}-{m:02d}-{d:02d}"
 
-    # mm/dd/yyyy (or m/d/yyyy)
-    for fmt in ("%m/%d/%Y", "%m/%d/%y"):
-        try:
-            return datetime.strptime(s, fmt).strftime("%Y-%m-%d")
-        except ValueError:
-            pass
+    # mm/dd/yyyy (or m/d/yyyy, or a two-digit year as strptime's %y reads it)
+    mdy = MDY_RE.fullmatch(s)
+    if mdy is None:
+        return None
+    m, d, year = int(mdy[1]), int(mdy[2]), mdy[3]
+    if len(year) == 2:
+        y = int(year)
+        y += 2000 if y < 69 else 1900
+        year = str(y)
+    else:
+        y = int(year)
+    if y < 1 or not 1 <= m <= 12 or not 1 <= d <= monthrange(y, m)[1]:
+        return None
+    return f"{year}-{m:02d}-{d:02d}"
 
-    return None
+def first_value(v):
+    """GeoJSON dates arrive as one-element lists (["20150101"]); accept a bare value too."""
+    if isinstance(v, list):
+        return v[0] if v else None
+    return v or None
 
 # ---------- URL / domain helpers ----------
 
@@ -149,21 +191,35 @@ def clean_url(u: Optional[str]) -> Optional[str]:
     u = u.strip()
     if not u: return None
     # Some fields may contain NULs or whitespace junk
-    u = u.replace("\x00", "")
+    if "\x00" in u:
+        u = u.replace("\x00", "")
     return u
 
+# the netloc urlparse() would give: everything between "//" and the path/query/fragment
+DOMAIN_RE = re.compile(r"(?:[A-Za-z][A-Za-z0-9+.-]*:)?//([^/?#]*)")
+
 def domain_of(u: str) -> Optional[str]:
-    try:
-        netloc = urlparse(u).netloc.lower()
-        if not netloc: return None
-        if netloc.startswith("www."): netloc = netloc[4:]
-        return netloc
-    except Exception:
-        return None
+    m = DOMAIN_RE.match(u)
+    if not m: return None
+    netloc = m.group(1).lower()
+    if not netloc: return None
+    if netloc.startswith("www."): netloc = netloc[4:]
+    return netloc
 
 # ---------- SQLite schema (adds slug/published_at; adds sources) ----------
 
-SCHEMA_SQL = """
+# Same durability/caching settings the app uses; an ingest run is one big
+# write transaction per file, so WAL + synchronous=NORMAL removes the per-commit fsync.
+SQLITE_PRAGMAS = (
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+SCHEMA_TABLES_SQL = """
 PRAGMA foreign_keys = ON;
 
 CREATE TABLE IF NOT EXISTS countries (
@@ -186,7 +242,8 @@ CREATE TABLE IF NOT EXISTS incidents (
     start_date      TEXT,
     end_date        TEXT,
     display         INTEGER NOT NULL DEFAULT 1,
-    published_at    TEXT   -- WP post datetime (ISO 8601) if available
+    published_at    TEXT,  -- WP post datetime (ISO 8601) if available
+    content_hash    TEXT   -- fingerprint of the GeoJSON records last ingested (see post_fingerprint)
 );
 
 CREATE TABLE IF NOT EXISTS actors (
@@ -251,6 +308,11 @@ CREATE TABLE IF NOT EXISTS incident_tools (
     FOREIGN KEY (tool_id)     REFERENCES tools(id)     ON DELETE CASCADE
 );
 
+"""
+
+# Secondary indexes + view; created after the bulk load so each index is built
+# once over the full table instead of being maintained row by row.
+SCHEMA_INDEXES_SQL = """
 -- Helpful indexes
 CREATE INDEX IF NOT EXISTS idx_incidents_start ON incidents(start_date);
 CREATE INDEX IF NOT EXISTS idx_incidents_end   ON incidents(end_date);
@@ -304,117 +366,297 @@ FROM incidents i;
 
 # ---------- DB helpers ----------
 
+SCHEMA_SQL = SCHEMA_TABLES_SQL + SCHEMA_INDEXES_SQL
+
+def apply_pragmas(conn: sqlite3.Connection):
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+
+@contextmanager
+def write_transaction(conn: sqlite3.Connection):
+    """BEGIN IMMEDIATE ... COMMIT, or ROLLBACK on error (one WAL commit per ingest)."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+def migrate_schema(conn: sqlite3.Connection):
+    """Add columns introduced after a DB was first created (CREATE TABLE IF NOT EXISTS won't)."""
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(incidents)")}
+    if "content_hash" not in cols:
+        conn.execute("ALTER TABLE incidents ADD COLUMN content_hash TEXT")
+        conn.commit()
+
 def exec_schema(conn: sqlite3.Connection):
     conn.executescript(SCHEMA_SQL)
+    migrate_schema(conn)
+
+# The DO UPDATE ... WHERE clauses skip the row rewrite when a re-ingest changes nothing
+UPSERT_COUNTRY_SQL = """
+    INSERT INTO countries(name, lat, lon, dataset_count_hint)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(name) DO UPDATE SET
+        lat=COALESCE(excluded.lat, countries.lat),
+        lon=COALESCE(excluded.lon, countries.lon),
+        dataset_count_hint=COALESCE(excluded.dataset_count_hint, countries.dataset_count_hint)
+    WHERE COALESCE(excluded.lat, countries.lat) IS NOT countries.lat
+       OR COALESCE(excluded.lon, countries.lon) IS NOT countries.lon
+       OR COALESCE(excluded.dataset_count_hint, countries.dataset_count_hint) IS NOT countries.dataset_count_hint
+"""
 
-def upsert_country(cur, name: str, lat: Optional[float], lon: Optional[float], count_hint: Optional[int]) -> int:
-    cur.execute("""
-        INSERT INTO countries(name, lat, lon, dataset_count_hint)
-        VALUES (?, ?, ?, ?)
-        ON CONFLICT(name) DO UPDATE SET
-            lat=COALESCE(excluded.lat, countries.lat),
-            lon=COALESCE(excluded.lon, countries.lon),
-            dataset_count_hint=COALESCE(excluded.dataset_count_hint, countries.dataset_count_hint)
-    """, (name, lat, lon, count_hint))
-    cur.execute("SELECT id FROM countries WHERE name = ?", (name,))
-    return cur.fetchone()[0]
-
-def upsert_actor(cur, term) -> int:
-    cur.execute("""
-        INSERT INTO actors(term_id, name, slug, taxonomy, description)
-        VALUES (?, ?, ?, ?, ?)
-        ON CONFLICT(term_id) DO UPDATE SET
-            name=excluded.name,
-            slug=excluded.slug,
-            taxonomy=excluded.taxonomy,
-            description=COALESCE(NULLIF(excluded.description,''), actors.description)
-    """, (
-        int(term.get("term_id")),
-        term.get("name") or "",
-        term.get("slug"),
-        term.get("taxonomy"),
-        term.get("description") or ""
-    ))
-    cur.execute("SELECT id FROM actors WHERE term_id = ?", (int(term.get("term_id")),))
-    return cur.fetchone()[0]
-
-def upsert_tool(cur, term) -> int:
-    cur.execute("""
-        INSERT INTO tools(term_id, name, slug, taxonomy, description)
-        VALUES (?, ?, ?, ?, ?)
-        ON CONFLICT(term_id) DO UPDATE SET
-            name=excluded.name,
-            slug=excluded.slug,
-            taxonomy=excluded.taxonomy,
-            description=COALESCE(NULLIF(excluded.description,''), tools.description)
-    """, (
+UPSERT_ACTOR_SQL = """
+    INSERT INTO actors(term_id, name, slug, taxonomy, description)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(term_id) DO UPDATE SET
+        name=excluded.name,
+        slug=excluded.slug,
+        taxonomy=excluded.taxonomy,
+        description=COALESCE(NULLIF(excluded.description,''), actors.description)
+    WHERE actors.name IS NOT excluded.name
+       OR actors.slug IS NOT excluded.slug
+       OR actors.taxonomy IS NOT excluded.taxonomy
+       OR COALESCE(NULLIF(excluded.description,''), actors.description) IS NOT actors.description
+"""
+
+UPSERT_TOOL_SQL = """
+    INSERT INTO tools(term_id, name, slug, taxonomy, description)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(term_id) DO UPDATE SET
+        name=excluded.name,
+        slug=excluded.slug,
+        taxonomy=excluded.taxonomy,
+        description=COALESCE(NULLIF(excluded.description,''), tools.description)
+    WHERE tools.name IS NOT excluded.name
+       OR tools.slug IS NOT excluded.slug
+       OR tools.taxonomy IS NOT excluded.taxonomy
+       OR COALESCE(NULLIF(excluded.description,''), tools.description) IS NOT tools.description
+"""
+
+UPSERT_SOURCE_SQL = """
+    INSERT INTO sources(url, domain)
+    VALUES (?, ?)
+    ON CONFLICT(url) DO UPDATE SET
+        domain=COALESCE(excluded.domain, sources.domain)
+    WHERE COALESCE(excluded.domain, sources.domain) IS NOT sources.domain
+"""
+
+# Only overwrite string fields if the new value is non-empty (avoid clobbering rich content with empty WP fields)
+UPSERT_INCIDENT_SQL = """
+    INSERT INTO incidents(post_id, slug, title, link, content_clean, excerpt_clean, date_text, start_date, end_date, display, published_at, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(post_id) DO UPDATE SET
+        slug        = CASE WHEN excluded.slug        IS NOT NULL AND excluded.slug        != '' THEN excluded.slug        ELSE incidents.slug        END,
+        title       = CASE WHEN excluded.title       IS NOT NULL AND excluded.title       != '' THEN excluded.title       ELSE incidents.title       END,
+        link        = CASE WHEN excluded.link        IS NOT NULL AND excluded.link        != '' THEN excluded.link        ELSE incidents.link        END,
+        content_clean=CASE WHEN excluded.content_clean IS NOT NULL AND excluded.content_clean != '' THEN excluded.content_clean ELSE incidents.content_clean END,
+        excerpt_clean=CASE WHEN excluded.excerpt_clean IS NOT NULL AND excluded.excerpt_clean != '' THEN excluded.excerpt_clean ELSE incidents.excerpt_clean END,
+        date_text   = CASE WHEN excluded.date_text   IS NOT NULL AND excluded.date_text   != '' THEN excluded.date_text   ELSE incidents.date_text   END,
+        start_date  = COALESCE(excluded.start_date, incidents.start_date),
+        end_date    = COALESCE(excluded.end_date,   incidents.end_date),
+        display     = excluded.display,
+        published_at= COALESCE(excluded.published_at, incidents.published_at),
+        content_hash= COALESCE(excluded.content_hash, incidents.content_hash)
+"""
+
+# Link rows are staged by natural key in a TEMP table, then resolved to surrogate
+# ids and inserted with a single INSERT ... SELECT join per link table.
+LINK_STAGES = {
+    "incident_countries": ("post_id INTEGER, name TEXT", """
+        INSERT OR IGNORE INTO incident_countries(incident_id, country_id)
+        SELECT DISTINCT i.id, c.id
+          FROM temp.stage_incident_countries s
+          JOIN incidents i ON i.post_id = s.post_id
+          JOIN countries c ON c.name = s.name
+    """),
+    "incident_actors": ("post_id INTEGER, term_id INTEGER", """
+        INSERT OR IGNORE INTO incident_actors(incident_id, actor_id)
+        SELECT DISTINCT i.id, a.id
+          FROM temp.stage_incident_actors s
+          JOIN incidents i ON i.post_id = s.post_id
+          JOIN actors a ON a.term_id = s.term_id
+    """),
+    "incident_tools": ("post_id INTEGER, term_id INTEGER", """
+        INSERT OR IGNORE INTO incident_tools(incident_id, tool_id)
+        SELECT DISTINCT i.id, t.id
+          FROM temp.stage_incident_tools s
+          JOIN incidents i ON i.post_id = s.post_id
+          JOIN tools t ON t.term_id = s.term_id
+    """),
+    # no DISTINCT here: the first ordinal staged for an (incident, url) pair wins
+    "incident_sources": ("post_id INTEGER, url TEXT, ordinal INTEGER", """
+        INSERT OR IGNORE INTO incident_sources(incident_id, source_id, ordinal)
+        SELECT i.id, src.id, s.ordinal
+          FROM temp.stage_incident_sources s
+          JOIN incidents i ON i.post_id = s.post_id
+          JOIN sources src ON src.url = s.url
+         ORDER BY s.rowid
+    """),
+}
+
+# Multi-row VALUES batches, kept under SQLITE_MAX_VARIABLE_NUMBER (999 before 3.32)
+MAX_SQL_VARS = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+LINK_BATCH_ROWS = 500
+
+@lru_cache(maxsize=64)  # a full batch plus one remainder per stage; built once
+def multi_values_sql(table: str, width: int, n_rows: int) -> str:
+    row = "(" + ", ".join(["?"] * width) + ")"
+    return f"INSERT INTO {table} VALUES " + ",".join([row] * n_rows)
+
+def insert_links(cur, link_table: str, rows):
+    """Insert natural-key link rows (post_id, key[, extra]) via the link table's TEMP stage."""
+    cols, flush_sql = LINK_STAGES[link_table]
+    stage = f"temp.stage_{link_table}"
+    cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS stage_{link_table} ({cols})")
+    width = cols.count(",") + 1
+    batch_rows = min(LINK_BATCH_ROWS, MAX_SQL_VARS // width)
+    rows = list(rows)
+    for start in range(0, len(rows), batch_rows):
+        batch = rows[start:start + batch_rows]
+        cur.execute(multi_values_sql(stage, width, len(batch)), list(chain.from_iterable(batch)))
+    cur.execute(flush_sql)
+    cur.execute(f"DROP TABLE {stage}")
+
+def term_row(term) -> tuple:
+    return (
         int(term.get("term_id")),
         term.get("name") or "",
         term.get("slug"),
         term.get("taxonomy"),
         term.get("description") or ""
-    ))
-    cur.execute("SELECT id FROM tools WHERE term_id = ?", (int(term.get("term_id")),))
-    return cur.fetchone()[0]
-
-def upsert_source(cur, url: str) -> int:
-    dom = domain_of(url)
-    cur.execute("""
-        INSERT INTO sources(url, domain)
-        VALUES (?, ?)
-        ON CONFLICT(url) DO UPDATE SET
-            domain=COALESCE(excluded.domain, sources.domain)
-    """, (url, dom))
-    cur.execute("SELECT id FROM sources WHERE url = ?", (url,))
-    return cur.fetchone()[0]
-
-def upsert_incident(cur, *, post_id: int, title: str, link: Optional[str],
-                    slug: Optional[str], content_clean: Optional[str],
-                    excerpt_clean: Optional[str], date_text: Optional[str],
-                    start_iso: Optional[str], end_iso: Optional[str],
-                    display: int, published_at: Optional[str]) -> int:
-    # Only overwrite string fields if the new value is non-empty (avoid clobbering rich content with empty WP fields)
-    cur.execute("""
-        INSERT INTO incidents(post_id, slug, title, link, content_clean, excerpt_clean, date_text, start_date, end_date, display, published_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(post_id) DO UPDATE SET
-            slug        = CASE WHEN excluded.slug        IS NOT NULL AND excluded.slug        != '' THEN excluded.slug        ELSE incidents.slug        END,
-            title       = CASE WHEN excluded.title       IS NOT NULL AND excluded.title       != '' THEN excluded.title       ELSE incidents.title       END,
-            link        = CASE WHEN excluded.link        IS NOT NULL AND excluded.link        != '' THEN excluded.link        ELSE incidents.link        END,
-            content_clean=CASE WHEN excluded.content_clean IS NOT NULL AND excluded.content_clean != '' THEN excluded.content_clean ELSE incidents.content_clean END,
-            excerpt_clean=CASE WHEN excluded.excerpt_clean IS NOT NULL AND excluded.excerpt_clean != '' THEN excluded.excerpt_clean ELSE incidents.excerpt_clean END,
-            date_text   = CASE WHEN excluded.date_text   IS NOT NULL AND excluded.date_text   != '' THEN excluded.date_text   ELSE incidents.date_text   END,
-            start_date  = COALESCE(excluded.start_date, incidents.start_date),
-            end_date    = COALESCE(excluded.end_date,   incidents.end_date),
-            display     = excluded.display,
-            published_at= COALESCE(excluded.published_at, incidents.published_at)
-    """, (post_id, slug, title, link, content_clean, excerpt_clean, date_text, start_iso, end_iso, display, published_at))
-    cur.execute("SELECT id FROM incidents WHERE post_id = ?", (post_id,))
-    return cur.fetchone()[0]
-
-def link_incident_country(cur, incident_id: int, country_id: int):
-    cur.execute("INSERT OR IGNORE INTO incident_countries(incident_id, country_id) VALUES (?, ?)", (incident_id, country_id))
-
-def link_incident_actor(cur, incident_id: int, actor_id: int, role: Optional[str] = None, confidence: Optional[str] = None):
-    cur.execute("INSERT OR IGNORE INTO incident_actors(incident_id, actor_id, role, confidence) VALUES (?, ?, ?, ?)",
-                (incident_id, actor_id, role, confidence))
-
-def link_incident_tool(cur, incident_id: int, tool_id: int):
-    cur.execute("INSERT OR IGNORE INTO incident_tools(incident_id, tool_id) VALUES (?, ?)", (incident_id, tool_id))
-
-def link_incident_source(cur, incident_id: int, source_id: int, ordinal: Optional[int]):
-    cur.execute("INSERT OR IGNORE INTO incident_sources(incident_id, source_id, ordinal) VALUES (?, ?, ?)",
-                (incident_id, source_id, ordinal))
+    )
+
+# Repeated actors/tools/countries are folded into one row per natural key before
+# they reach SQLite, merged exactly as the ON CONFLICT clauses above would.
+def merge_term(terms: dict, term) -> int:
+    row = term_row(term)
+    prev = terms.get(row[0])
+    if prev is not None and not row[4]:
+        row = row[:4] + (prev[4],)  # keep the last non-empty description
+    terms[row[0]] = row
+    return row[0]
+
+def merge_country(countries: dict, name: str, lat, lon, count_hint):
+    prev = countries.get(name)
+    if prev is not None:
+        lat = prev[1] if lat is None else lat
+        lon = prev[2] if lon is None else lon
+        count_hint = prev[3] if count_hint is None else count_hint
+    countries[name] = (name, lat, lon, count_hint)
+
+def merge_incident(incidents: dict, row: tuple):
+    """Fold an UPSERT_INCIDENT_SQL row into incidents[post_id] the way its ON CONFLICT would."""
+    prev = incidents.get(row[0])
+    if prev is not None:
+        merged = list(row)
+        for i in range(1, len(row)):
+            if i == 9:
+                continue  # display: last value wins
+            if row[i] is None or (i <= 6 and row[i] == ""):  # text fields also keep on ''
+                merged[i] = prev[i]
+        row = tuple(merged)
+    incidents[row[0]] = row
+
+class IngestBatch:
+    """Rows from every input file, folded by natural key and written once by write_batch()."""
+    def __init__(self):
+        self.countries = {}   # name -> UPSERT_COUNTRY_SQL params
+        self.actors = {}      # term_id -> UPSERT_ACTOR_SQL params
+        self.tools = {}       # term_id -> UPSERT_TOOL_SQL params
+        self.sources = {}     # url -> UPSERT_SOURCE_SQL params
+        self.incidents = {}   # post_id -> UPSERT_INCIDENT_SQL params
+        self.links = {link_table: [] for link_table in LINK_STAGES}  # natural-key link rows
 
 # ---------- Ingestors ----------
 
-def ingest_geojson(conn: sqlite3.Connection, json_path: str):
-    cur = conn.cursor()
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def load_json(json_path: str):
+    with open(json_path, "rb") as f:
+        raw = f.read()
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def iter_json_items(json_path: str, prefix: str):
+    """Yield the array items at an ijson-style prefix, e.g. "features.item".
 
-    features = data.get("features", [])
-    for ftr in features:
+    With ijson installed the file is streamed, so peak memory is one item
+    rather than the whole parse tree; otherwise it is parsed by load_json().
+    """
+    if ijson is not None:
+        with open(json_path, "rb") as f:
+            yield from ijson.items(f, prefix, use_float=True)
+        return
+    data = load_json(json_path)
+    for key in prefix.split(".")[:-1]:
+        data = data.get(key, []) if isinstance(data, dict) else []
+    yield from data or []
+
+# raw GeoJSON incident fields that feed the incidents row
+GEO_INCIDENT_FIELDS = ("title", "link", "content", "excerpt", "date_text", "start_date", "end_date", "display")
+
+def post_fingerprint(records: list) -> str:
+    """Fingerprint of every GeoJSON record for one post_id, in file order."""
+    raw = json.dumps([[inc.get(k) for k in GEO_INCIDENT_FIELDS] for inc in records],
+                     ensure_ascii=False, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+def geo_incident_row(post_id: int, inc: dict, fingerprint: Optional[str],
+                     cleaned: Optional[tuple] = None) -> tuple:
+    """UPSERT_INCIDENT_SQL parameters for one GeoJSON incident (the CPU-heavy part).
+
+    cleaned: the (content_clean, excerpt_clean) stored for an unchanged post; skips cleaning.
+    """
+    title = (inc.get("title") or "").strip()
+    link = inc.get("link") or None
+    if cleaned is None:
+        content_clean = clean_rich_text(inc.get("content") or "")
+        excerpt_clean = clean_rich_text(inc.get("excerpt") or "")
+    else:
+        content_clean, excerpt_clean = cleaned
+    date_text = (inc.get("date_text") or "").strip()
+    start_raw = first_value(inc.get("start_date"))
+    end_raw   = first_value(inc.get("end_date"))
+    start_iso = normalize_date(start_raw)
+    end_iso   = normalize_date(end_raw)
+    display   = 1 if inc.get("display", True) else 0
+    return (post_id, None, title, link, content_clean, excerpt_clean,
+            date_text, start_iso, end_iso, display, None, fingerprint)
+
+def clean_incident_rows(pending: list, workers: int = 1) -> list:
+    """geo_incident_row() over (post_id, inc, fingerprint) triples, in order.
+
+    Cleaning is pure CPU work, so with workers > 1 it is spread over a process
+    pool; SQLite writes stay serial in the caller. Pool start-up costs more than
+    it saves on small files, hence the serial default.
+    """
+    if workers <= 1 or len(pending) < 2:
+        return [geo_incident_row(*args) for args in pending]
+    # ship only the fields geo_incident_row reads, not the actor/tool lists
+    pending = [(post_id, {k: inc.get(k) for k in GEO_INCIDENT_FIELDS}, fingerprint)
+               for post_id, inc, fingerprint in pending]
+    with multiprocessing.Pool(workers) as pool:
+        return pool.starmap(geo_incident_row, pending, chunksize=64)
+
+def collect_geojson(conn: sqlite3.Connection, json_path: str, batch: IngestBatch, workers: int = 1):
+    # A post_id whose records all match the last ingest's fingerprint reuses the stored
+    # clean text instead of re-cleaning it. Its row is still folded and upserted: the
+    # stored row also carries WP fields and edits that this file must override again.
+    known = {post_id: (fingerprint, (content_clean, excerpt_clean))
+             for post_id, fingerprint, content_clean, excerpt_clean in conn.execute(
+                 "SELECT post_id, content_hash, content_clean, excerpt_clean"
+                 " FROM incidents WHERE content_hash IS NOT NULL")}
+
+    # Flatten features into per-table rows; links keep natural keys
+    # (post_id / country name / term_id) until the surrogate ids are known.
+    countries, actors, tools = batch.countries, batch.actors, batch.tools
+    records = {}  # post_id -> its incident records, in file order
+    # hoisted for the per-incident loop
+    records_setdefault = records.setdefault
+    add_country_link = batch.links["incident_countries"].append
+    add_actor_link = batch.links["incident_actors"].append
+    add_tool_link = batch.links["incident_tools"].append
+
+    for ftr in iter_json_items(json_path, "features.item"):
         props = ftr.get("properties", {}) or {}
         geom = ftr.get("geometry", {}) or {}
         coords = geom.get("coordinates") or [None, None]
@@ -430,56 +672,58 @@ def ingest_geojson(conn: sqlite3.Connection, json_path: str):
         if not country_name:
             continue
 
-        country_id = upsert_country(cur, country_name, lat, lon, count_hint)
+        merge_country(countries, country_name, lat, lon, count_hint)
 
         for inc in props.get("incidents", []) or []:
-            post_id = int(inc.get("post_id"))
-            title = (inc.get("title") or "").strip()
-            link = inc.get("link") or None
-            content_clean = clean_rich_text(inc.get("content") or "")
-            excerpt_clean = clean_rich_text(inc.get("excerpt") or "")
-            date_text = (inc.get("date_text") or "").strip()
-            start_raw = (inc.get("start_date") or [None])[0]
-            end_raw   = (inc.get("end_date")   or [None])[0]
-            start_iso = normalize_date(start_raw)
-            end_iso   = normalize_date(end_raw)
-            display   = 1 if inc.get("display", True) else 0
-
-            incident_id = upsert_incident(
-                cur,
-                post_id=post_id, title=title, link=link, slug=None,
-                content_clean=content_clean, excerpt_clean=excerpt_clean,
-                date_text=date_text, start_iso=start_iso, end_iso=end_iso,
-                display=display, published_at=None
-            )
+            inc_get = inc.get
+            post_id = int(inc_get("post_id"))
+            records_setdefault(post_id, []).append(inc)
 
             # country link (multi-country handled if this post_id appears in multiple features)
-            link_incident_country(cur, incident_id, country_id)
+            add_country_link((post_id, country_name))
 
             # actors
-            for a in inc.get("actors", []) or []:
-                actor_id = upsert_actor(cur, a)
-                link_incident_actor(cur, incident_id, actor_id)
+            for a in inc_get("actors", []) or []:
+                add_actor_link((post_id, merge_term(actors, a)))
 
             # tools
-            for t in inc.get("tools", []) or []:
-                tool_id = upsert_tool(cur, t)
-                link_incident_tool(cur, incident_id, tool_id)
+            for t in inc_get("tools", []) or []:
+                add_tool_link((post_id, merge_term(tools, t)))
+
+    # A post_id listed under several features is fingerprinted as a whole: skipping
+    # only some of its records would let an earlier one win the fold below.
+    pending = []  # (post_id, inc, fingerprint) still to be cleaned
+    for post_id, incs in records.items():
+        fingerprint = post_fingerprint(incs)
+        stored = known.get(post_id)
+        if stored is not None and stored[0] == fingerprint:
+            for inc in incs:
+                merge_incident(batch.incidents, geo_incident_row(post_id, inc, fingerprint, stored[1]))
+        else:
+            pending.extend((post_id, inc, fingerprint) for inc in incs)
 
-    conn.commit()
+    # each post_id's rows keep their file order, so they fold exactly as the upserts would
+    for row in clean_incident_rows(pending, workers):
+        merge_incident(batch.incidents, row)
 
-def _iter_wp_sources(acf: dict) -> Iterable[tuple[int, Optional[str]]]:
-    # yields (ordinal, url or None)
-    for idx, key in enumerate(["source", "source_2", "source_3", "source_4", "source_5"], start=1):
-        u = clean_url(acf.get(key))
-        yield (idx, u if u else None)
+EMPTY_DICT = {}  # shared read-only default for missing nested objects
 
-def ingest_wpjson(conn: sqlite3.Connection, json_path: str):
-    cur = conn.cursor()
-    with open(json_path, "r", encoding="utf-8") as f:
-        items = json.load(f)
+WP_SOURCE_KEYS = ("source", "source_2", "source_3", "source_4", "source_5")
 
-    for item in items:
+def _wp_sources(acf: dict) -> list[tuple[int, str]]:
+    # (ordinal, url) for the filled ACF source slots
+    return [(idx, u) for idx, u in enumerate(map(clean_url, map(acf.get, WP_SOURCE_KEYS)), start=1) if u]
+
+def collect_wpjson(conn: sqlite3.Connection, json_path: str, batch: IngestBatch):
+    # Same shape as collect_geojson: per-table rows, links by natural key
+    countries, sources, incidents = batch.countries, batch.sources, batch.incidents
+    # url -> domain already stored; those rows need no upsert, only their links
+    known_sources = dict(conn.execute("SELECT url, domain FROM sources"))
+    # hoisted for the per-item loop
+    add_country_link = batch.links["incident_countries"].append
+    add_source_link = batch.links["incident_sources"].append
+
+    for item in iter_json_items(json_path, "item"):
         post_id = int(item.get("id"))
         slug = (item.get("slug") or "").strip() or None
         title = clean_rich_text((item.get("title", {}).get("rendered") or "").strip())
@@ -490,50 +734,69 @@ def ingest_wpjson(conn: sqlite3.Connection, json_path: str):
 
         published_at = item.get("date") or None
         acf = item.get("acf", {}) or {}
+        acf_get = acf.get
 
-        date_text = (acf.get("date_text") or "").strip() or None
-        start_iso = normalize_date(acf.get("start_date"))
-        end_iso   = normalize_date(acf.get("end_date"))
+        date_text = (acf_get("date_text") or "").strip() or None
+        start_iso = normalize_date(acf_get("start_date"))
+        end_iso   = normalize_date(acf_get("end_date"))
 
         # WP JSON here has no content/excerpt for incidents; avoid clobbering richer data already stored
-        incident_id = upsert_incident(
-            cur,
-            post_id=post_id, slug=slug, title=title, link=link,
-            content_clean=None, excerpt_clean=None,
-            date_text=date_text, start_iso=start_iso, end_iso=end_iso,
-            display=1, published_at=published_at
-        )
+        merge_incident(incidents, (post_id, slug, title, link, None, None, date_text,
+                                   start_iso, end_iso, 1, published_at, None))
 
         # country from ACF
         # Prefer acf.country, else acf.location.country/name, and lat/lng if present
-        country_name = (acf.get("country") or
-                        (acf.get("location") or {}).get("country") or
-                        (acf.get("location") or {}).get("name") or "").strip()
+        country_name = acf_get("country")
+        if not country_name:
+            location = acf_get("location") or EMPTY_DICT
+            country_name = location.get("country") or location.get("name")
+        country_name = (country_name or "").strip()
         lat = None
         lon = None
         try:
-            lat = float(acf.get("latitude")) if acf.get("latitude") not in (None, "") else None
-            lon = float(acf.get("longitude")) if acf.get("longitude") not in (None, "") else None
+            latitude, longitude = acf_get("latitude"), acf_get("longitude")
+            lat = float(latitude) if latitude not in (None, "") else None
+            lon = float(longitude) if longitude not in (None, "") else None
         except Exception:
             lat = lat or None
             lon = lon or None
 
         if country_name:
-            country_id = upsert_country(cur, country_name, lat, lon, None)
-            link_incident_country(cur, incident_id, country_id)
+            merge_country(countries, country_name, lat, lon, None)
+            add_country_link((post_id, country_name))
 
         # sources
-        for ordinal, u in _iter_wp_sources(acf):
-            if not u: 
-                continue
-            try:
-                sid = upsert_source(cur, u)
-                link_incident_source(cur, incident_id, sid, ordinal)
-            except Exception:
-                # swallow bad URLs to keep ingest resilient
-                pass
+        for ordinal, u in _wp_sources(acf):
+            if u not in sources:
+                domain = domain_of(u)
+                if u not in known_sources or (domain is not None and known_sources[u] != domain):
+                    sources[u] = (u, domain)
+            add_source_link((post_id, u, ordinal))
+
+def write_batch(conn: sqlite3.Connection, batch: IngestBatch):
+    """One executemany per table, then the link flushes (main() supplies the transaction)."""
+    cur = conn.cursor()
+    cur.executemany(UPSERT_COUNTRY_SQL, batch.countries.values())
+    cur.executemany(UPSERT_INCIDENT_SQL, batch.incidents.values())
+    cur.executemany(UPSERT_ACTOR_SQL, batch.actors.values())
+    cur.executemany(UPSERT_TOOL_SQL, batch.tools.values())
+    cur.executemany(UPSERT_SOURCE_SQL, batch.sources.values())
+
+    for link_table, rows in batch.links.items():
+        if rows:
+            insert_links(cur, link_table, rows)
+
+def ingest_geojson(conn: sqlite3.Connection, json_path: str, workers: int = 1):
+    batch = IngestBatch()
+    collect_geojson(conn, json_path, batch, workers)
+    with write_transaction(conn):
+        write_batch(conn, batch)
 
-    conn.commit()
+def ingest_wpjson(conn: sqlite3.Connection, json_path: str):
+    batch = IngestBatch()
+    collect_wpjson(conn, json_path, batch)
+    with write_transaction(conn):
+        write_batch(conn, batch)
 
 # ---------- CLI ----------
 
@@ -542,16 +805,25 @@ def main():
     ap.add_argument("--db", help="Path to the SQLite DB file (created/updated).", default="./data/incidents.sqlite")
     ap.add_argument("--geojson", help="Path to GeoJSON FeatureCollection (country → incidents[]).", default="./data/incidents.json")
     ap.add_argument("--wpjson", help="Path to incidents_10000.json (WordPress posts).", default="./data/incidents_10000.json")
+    ap.add_argument("--workers", type=int, default=1, help="Processes used to clean GeoJSON text (default: 1, no pool).")
     args = ap.parse_args()
 
     with sqlite3.connect(args.db) as conn:
-        conn.execute("PRAGMA foreign_keys = ON;")
-        exec_schema(conn)
+        apply_pragmas(conn)
+        conn.executescript(SCHEMA_TABLES_SQL)
+        migrate_schema(conn)
 
+        # Both files are folded into one batch (WP rows merge into GeoJSON rows by
+        # post_id in Python), then written in a single transaction.
+        batch = IngestBatch()
         if args.geojson:
-            ingest_geojson(conn, args.geojson)
+            collect_geojson(conn, args.geojson, batch, workers=args.workers)
         if args.wpjson:
-            ingest_wpjson(conn, args.wpjson)
+            collect_wpjson(conn, args.wpjson, batch)
+        with write_transaction(conn):
+            write_batch(conn, batch)
+
+        conn.executescript(SCHEMA_INDEXES_SQL)
 
     print("✅ Ingest complete.")
     print(f"→ DB: {args.db}")
@@ -1,5 +1,6 @@
 let config = null;
 let meta = null;
+let centroids = {};
 
 const state = {
   page: 1,
@@ -72,6 +73,7 @@ const $$ = (sel) => Array.from(document.querySelectorAll(sel));
 async function init() {
   config = await (await fetch("/api/config")).json();
   meta = await (await fetch("/api/meta")).json();
+  centroids = await (await fetch("/api/centroids")).json();
 
   // UI bindings
   $("#start").addEventListener("change", () => { state.filters.start = $("#start").value || null; state.page = 1; refresh(); });
@@ -115,7 +117,7 @@ async function refresh() {
 
   renderHeatmap(data.heatmap);
   renderStacked(data.stacked);
-  renderMap(data.country_actor, data.country_meta);
+  renderMap(data.country_actor, centroids);
   renderList(data.incidents);
 }
 